@@ -6,11 +6,19 @@ SVG to PDF converter with three scaling strategies:
 - Cropped: Scale to fit height, crop horizontally from center
 """
 
+import argparse
+import hashlib
+import io
 import os
+import re
+import shutil
 import sys
 import subprocess
 import tempfile
+import threading
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import lru_cache, partial
 from pathlib import Path
 
 # Physical dimensions: 707mm x 1000mm @ 300 DPI
@@ -20,47 +28,171 @@ TARGET_WIDTH = 8350
 TARGET_HEIGHT = 11811
 TARGET_DPI = 300
 
-def detect_background_color(svg_path):
+# Output variants, in the order they are generated
+MODES = ('centered', 'stretched', 'cropped')
+
+
+class InkscapeShell:
     """
-    Detect the background color of an SVG file.
-    Returns 'white' or 'black'.
+    A long-running `inkscape --shell` process.
 
-    Strategy:
-    1. Check SVG attributes (viewport-fill, style background)
-    2. Look for a background rect element with explicit fill
-    3. Render with white bg and sample - if corners differ significantly, it has its own bg
+    Inkscape's startup (GTK init, font cache) dominates small renders, so
+    each worker keeps one shell open and feeds it export actions instead
+    of launching inkscape for every render.
     """
-    from PIL import Image
+
+    PROMPT = b'> '
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            ['inkscape', '--shell'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        # The conversion modes run in threads, but the shell handles one
+        # command at a time
+        self.lock = threading.Lock()
+        self._read_until_prompt()
+
+    def _read_until_prompt(self):
+        output = b''
+        while not output.endswith(self.PROMPT):
+            char = self.process.stdout.read(1)
+            if not char:
+                raise RuntimeError(
+                    f"Inkscape shell exited unexpectedly: {output.decode(errors='replace')[-500:]}"
+                )
+            output += char
+        return output
+
+    def render(self, svg_path, width, height):
+        """
+        Render svg_path at width x height and return the PNG bytes.
+        The PNG keeps the SVG's transparency.
+        """
+        # The shell's stdout carries the prompt, so it can't export to '-';
+        # the PNG goes through a temp file that is read straight back
+        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
+            tmp_png = tmp.name
+
+        actions = [
+            f'file-open:{svg_path}',
+            'export-type:png',
+            f'export-filename:{tmp_png}',
+            f'export-width:{width}',
+            f'export-height:{height}',
+            'export-do',
+            'file-close',
+        ]
+
+        try:
+            with self.lock:
+                self.process.stdin.write(('; '.join(actions) + '\n').encode())
+                self.process.stdin.flush()
+                self._read_until_prompt()
+
+            png_bytes = Path(tmp_png).read_bytes()
+            if not png_bytes:
+                raise RuntimeError(f"Inkscape did not export {svg_path}")
+            return png_bytes
+
+        finally:
+            if os.path.exists(tmp_png):
+                os.unlink(tmp_png)
+
+
+_inkscape_shell = None
+_inkscape_shell_lock = threading.Lock()
+
+
+def get_inkscape_shell():
+    """
+    Return this process's Inkscape shell, starting it on first use.
+    The shell exits on its own when the process ends and closes its stdin.
+    """
+    global _inkscape_shell
+    with _inkscape_shell_lock:
+        if _inkscape_shell is None:
+            _inkscape_shell = InkscapeShell()
+    return _inkscape_shell
+
+
+def render_svg(svg_path, width, height):
+    """
+    Render svg_path at width x height and return the PNG bytes.
+    The PNG keeps the SVG's transparency.
+
+    Uses rsvg-convert, a single-purpose renderer that starts in milliseconds,
+    and falls back to the Inkscape shell if it isn't installed.
+    """
+    command = ['rsvg-convert', '--width', str(width), '--height', str(height)]
+    command.append(str(svg_path))
 
     try:
-        # First, parse SVG and look for explicit background indicators
-        tree = ET.parse(svg_path)
-        root = tree.getroot()
-
-        # Check viewport-fill attribute
-        viewport_fill = root.get('viewport-fill', '')
-        if viewport_fill:
-            if any(b in viewport_fill.lower() for b in ['#000', 'black', 'rgb(0,0,0)']):
-                return 'black'
-            elif any(w in viewport_fill.lower() for w in ['#fff', 'white', 'rgb(255,255,255)']):
-                return 'white'
+        return subprocess.run(command, check=True, capture_output=True).stdout
+    except FileNotFoundError:
+        return get_inkscape_shell().render(svg_path, width, height)
+
+
+# Color values that mark a black or white background
+_BLACK = r'#000|black|rgb\(\s*0\s*,\s*0\s*,\s*0\s*\)'
+_WHITE = r'#fff|white|rgb\(\s*255\s*,\s*255\s*,\s*255\s*\)'
+_BLACK_RE = re.compile(_BLACK, re.I)
+_WHITE_RE = re.compile(_WHITE, re.I)
+_FILL_BLACK_RE = re.compile(rf'fill:\s*(?:{_BLACK})', re.I)
+_FILL_WHITE_RE = re.compile(rf'fill:\s*(?:{_WHITE})', re.I)
+
+_SVG_NS = '{http://www.w3.org/2000/svg}'
+_RECT_TAG = _SVG_NS + 'rect'
+
+# Only the first few rects are checked for a full-size background
+MAX_BACKGROUND_RECTS = 5
 
-        # Check style attribute for background
-        style = root.get('style', '')
-        if 'background' in style.lower():
-            if 'black' in style.lower() or '#000' in style.lower():
-                return 'black'
-            elif 'white' in style.lower() or '#fff' in style.lower():
-                return 'white'
-
-        # Look for a full-size background rect (first rect at 0,0 with 100% size)
-        for rect in root.findall('.//{http://www.w3.org/2000/svg}rect'):
-            x = rect.get('x', '0')
-            y = rect.get('y', '0')
-            width = rect.get('width', '')
-            height = rect.get('height', '')
-            fill = rect.get('fill', '')
-            rect_style = rect.get('style', '')
+
+def find_background_hint(svg_path):
+    """
+    Look for explicit background indicators in the SVG markup.
+    Returns 'black' or 'white', or None if the markup isn't conclusive.
+
+    The SVG is streamed, stopping after the root element and the first
+    MAX_BACKGROUND_RECTS rects, so large files are never fully parsed.
+    """
+    root = None
+    rects_seen = 0
+
+    with open(svg_path, 'rb') as f:
+        for event, elem in ET.iterparse(f, events=('start',)):
+            if root is None:
+                root = elem
+
+                # Check viewport-fill attribute
+                viewport_fill = root.get('viewport-fill', '')
+                if viewport_fill:
+                    if _BLACK_RE.search(viewport_fill):
+                        return 'black'
+                    elif _WHITE_RE.search(viewport_fill):
+                        return 'white'
+
+                # Check style attribute for background
+                style = root.get('style', '')
+                if 'background' in style.lower():
+                    if _BLACK_RE.search(style):
+                        return 'black'
+                    elif _WHITE_RE.search(style):
+                        return 'white'
+                continue
+
+            if elem.tag != _RECT_TAG:
+                continue
+
+            # Look for a full-size background rect (rect at 0,0 with 100% size)
+            x = elem.get('x', '0')
+            y = elem.get('y', '0')
+            width = elem.get('width', '')
+            height = elem.get('height', '')
+            fill = elem.get('fill', '')
+            rect_style = elem.get('style', '')
 
             # Check if this looks like a background rect
             is_at_origin = x in ['0', '0px', ''] and y in ['0', '0px', '']
@@ -69,206 +201,274 @@ def detect_background_color(svg_path):
 
             if is_at_origin and is_full_size:
                 if fill:
-                    if any(b in fill.lower() for b in ['#000', 'black']):
+                    if _BLACK_RE.search(fill):
                         return 'black'
-                    elif any(w in fill.lower() for w in ['#fff', 'white']):
+                    elif _WHITE_RE.search(fill):
                         return 'white'
                 if 'fill:' in rect_style:
-                    if any(b in rect_style.lower() for b in ['fill:#000', 'fill:black']):
+                    if _FILL_BLACK_RE.search(rect_style):
                         return 'black'
-                    elif any(w in rect_style.lower() for w in ['fill:#fff', 'fill:white']):
+                    elif _FILL_WHITE_RE.search(rect_style):
                         return 'white'
 
-        # Fallback: render to PNG and check if corners are opaque and dark
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            tmp_png = tmp.name
+                # The first full-size rect is the background, whatever its color
+                break
+
+            rects_seen += 1
+            if rects_seen >= MAX_BACKGROUND_RECTS:
+                break
+
+    return None
+
+
+# Properties that put paint on the page
+_COLOR_PROPERTIES = ('fill', 'stroke', 'stop-color', 'flood-color', 'lighting-color', 'color')
+_COLOR_DECLARATION_RE = re.compile(
+    r'(?<![\w-])(?:fill|stroke|stop-color|flood-color|lighting-color|color)\s*:\s*([^;}]+)',
+    re.I
+)
+_URL_RE = re.compile(r'url\([^)]*\)', re.I)
+_HEX_RE = re.compile(r'#([0-9a-f]{3,8})', re.I)
+_RGB_RE = re.compile(r'rgba?\(\s*([\d.]+%?)\s*,\s*([\d.]+%?)\s*,\s*([\d.]+%?)', re.I)
+_NO_PAINT = frozenset({'', 'none', 'transparent', 'currentcolor', 'inherit', 'initial', 'unset'})
+_GRAY_NAMES = frozenset({
+    'black', 'white', 'gray', 'grey', 'silver', 'dimgray', 'dimgrey', 'darkgray',
+    'darkgrey', 'lightgray', 'lightgrey', 'gainsboro', 'whitesmoke',
+})
+# Elements that can bring in color whatever the paint values say
+_COLORING_TAGS = frozenset(_SVG_NS + tag for tag in (
+    'image', 'foreignObject', 'feImage', 'feColorMatrix', 'feComponentTransfer', 'feTurbulence',
+))
+
+
+def is_gray_paint(value):
+    """
+    Check whether a paint or color value is a shade of gray. Values that
+    can't be parsed count as color, so the check errs on the safe side.
+    """
+    # Gradient references are fine - their stop colors are checked separately
+    value = _URL_RE.sub('', value).replace('!important', '').strip().lower()
+    if value in _NO_PAINT or value in _GRAY_NAMES:
+        return True
 
-        try:
-            # Render WITHOUT background to preserve transparency
-            subprocess.run([
-                'inkscape',
-                '--export-type=png',
-                '--export-filename=' + tmp_png,
-                '--export-width=100',
-                '--export-height=100',
-                str(svg_path)
-            ], check=True, capture_output=True)
-
-            img = Image.open(tmp_png)
-
-            # Check if image has alpha channel
-            if img.mode == 'RGBA':
-                # Sample corners for alpha - if transparent, there's no explicit background
-                width, height = img.size
-                margin = 2
-                corners = [
-                    (margin, margin),
-                    (width - margin - 1, margin),
-                    (margin, height - margin - 1),
-                    (width - margin - 1, height - margin - 1)
-                ]
-
-                transparent_corners = 0
-                dark_corners = 0
-
-                for x, y in corners:
-                    pixel = img.getpixel((x, y))
-                    alpha = pixel[3] if len(pixel) > 3 else 255
-                    if alpha < 128:
-                        transparent_corners += 1
-                    else:
-                        brightness = sum(pixel[:3]) / 3
-                        if brightness < 64:  # Very dark
-                            dark_corners += 1
-
-                # If corners are mostly transparent, no explicit background
-                if transparent_corners >= 3:
-                    return 'white'  # Default to white for transparent SVGs
-
-                # If corners are opaque and dark, it's a black background
-                if dark_corners >= 3:
-                    return 'black'
+    match = _HEX_RE.fullmatch(value)
+    if match:
+        digits = match.group(1)
+        if len(digits) in (3, 4):
+            return digits[0] == digits[1] == digits[2]
+        if len(digits) in (6, 8):
+            return digits[0:2] == digits[2:4] == digits[4:6]
+        return False
 
-        finally:
-            if os.path.exists(tmp_png):
-                os.unlink(tmp_png)
+    match = _RGB_RE.match(value)
+    if match:
+        r, g, b = match.groups()
+        return r == g == b
+
+    return False
+
+
+def is_grayscale_svg(svg_path):
+    """
+    Check from the markup alone whether the SVG only paints in grays.
+    Rendering gray paint gives identical R, G and B bands, so the master
+    can skip the colourspace conversion without decoding it to find out.
+    """
+    try:
+        with open(svg_path, 'rb') as f:
+            for event, elem in ET.iterparse(f, events=('end',)):
+                if elem.tag in _COLORING_TAGS:
+                    return False
+
+                for prop in _COLOR_PROPERTIES:
+                    value = elem.get(prop)
+                    if value is not None and not is_gray_paint(value):
+                        return False
+
+                css = elem.get('style', '')
+                if elem.tag == _SVG_NS + 'style':
+                    css += ';' + (elem.text or '')
+                if not all(is_gray_paint(value) for value in _COLOR_DECLARATION_RE.findall(css)):
+                    return False
+
+                # Finished elements aren't needed again - keep memory flat
+                elem.clear()
+
+    except (OSError, ET.ParseError):
+        return False
+
+    return True
+
+
+def detect_background_color(svg_path):
+    """
+    Detect the background color of an SVG file.
+    Returns 'white' or 'black'. Results are cached per file and
+    modification time, so repeat calls are free.
+
+    Strategy:
+    1. Check SVG attributes (viewport-fill, style background)
+    2. Look for a background rect element with explicit fill
+    3. Only if neither is conclusive, render without a background and sample
+       the corners - if they are opaque, the SVG draws its own bg
+    """
+    try:
+        svg_path = Path(svg_path).resolve()
+        mtime = os.path.getmtime(svg_path)
+    except OSError as e:
+        print(f"  [{Path(svg_path).name}] Warning: Background detection failed: {e}")
+        return 'white'  # Default to white
+
+    return _detect_background_color(str(svg_path), mtime)
+
+
+@lru_cache(maxsize=None)
+def _detect_background_color(svg_path, mtime):
+    try:
+        color = find_background_hint(svg_path)
+        if color:
+            return color
+
+        import numpy as np
+        from PIL import Image
+
+        # Fallback: render to PNG and check if corners are opaque and dark
+        png_bytes = render_svg(svg_path, 100, 100)
+        img = Image.open(io.BytesIO(png_bytes))
+
+        # Check if image has alpha channel
+        if img.mode == 'RGBA':
+            # Sample corners for alpha - if transparent, there's no explicit background
+            pixels = np.asarray(img)
+            margin = 2
+            near, far = margin, -margin - 1
+            corners = pixels[[near, near, far, far], [near, far, near, far]]
+
+            alpha = corners[:, 3]
+            brightness = corners[:, :3].mean(axis=1)
+            transparent_corners = int((alpha < 128).sum())
+            dark_corners = int(((alpha >= 128) & (brightness < 64)).sum())  # Very dark
+
+            # If corners are mostly transparent, no explicit background
+            if transparent_corners >= 3:
+                return 'white'  # Default to white for transparent SVGs
+
+            # If corners are opaque and dark, it's a black background
+            if dark_corners >= 3:
+                return 'black'
 
     except Exception as e:
-        print(f"  Warning: Background detection failed: {e}")
+        print(f"  [{Path(svg_path).name}] Warning: Background detection failed: {e}")
 
     return 'white'  # Default to white
 
 
-def convert_centered(svg_path, output_pdf, background_color):
+def background_value(background_color):
     """
-    Centered mode: Scale square SVG to 2004x2004, center vertically with padding.
+    Grayscale pixel value for a detected background color.
     """
-    print(f"  Converting centered mode with {background_color} background...")
+    return 0 if background_color == 'black' else 255
 
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-        tmp_png = tmp.name
 
-    try:
-        # Step 1: Convert SVG to PNG at target width (2004x2004)
-        # Use --export-background to handle SVGs with transparent backgrounds
-        subprocess.run([
-            'inkscape',
-            '--export-type=png',
-            '--export-filename=' + tmp_png,
-            '--export-width=' + str(TARGET_WIDTH),
-            '--export-height=' + str(TARGET_WIDTH),
-            '--export-background=' + background_color,
-            str(svg_path)
-        ], check=True, capture_output=True)
-
-        # Step 2: Add padding, convert to grayscale, set correct DPI for 707x1000mm
-        subprocess.run([
-            'convert',
-            tmp_png,
-            '-gravity', 'center',
-            '-background', background_color,
-            '-extent', f'{TARGET_WIDTH}x{TARGET_HEIGHT}',
-            '-colorspace', 'Gray',
-            '-density', str(TARGET_DPI),
-            '-units', 'PixelsPerInch',
-            output_pdf
-        ], check=True, capture_output=True)
-
-    finally:
-        if os.path.exists(tmp_png):
-            os.unlink(tmp_png)
-
-
-def convert_stretched(svg_path, output_pdf):
+def render_master(svg_path):
     """
-    Stretched mode: Scale to exact dimensions (aspect ratio ignored).
+    Render the SVG once at TARGET_HEIGHT x TARGET_HEIGHT - the largest size
+    any mode needs. All three variants are derived from this image, so the
+    vector artwork is only rasterized once.
+
+    The render keeps its transparency, so it doesn't depend on the detected
+    background and can run while detection is still in progress.
+    Returns the PNG bytes.
     """
-    print(f"  Converting stretched mode...")
+    return render_svg(svg_path, TARGET_HEIGHT, TARGET_HEIGHT)
 
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-        tmp_png = tmp.name
 
-    try:
-        # Convert SVG to PNG at exact target dimensions
-        subprocess.run([
-            'inkscape',
-            '--export-type=png',
-            '--export-filename=' + tmp_png,
-            '--export-width=' + str(TARGET_WIDTH),
-            '--export-height=' + str(TARGET_HEIGHT),
-            str(svg_path)
-        ], check=True, capture_output=True)
+def load_master(png_bytes, background_color, grayscale=False):
+    """
+    Open the master render flattened onto the background color.
+    Returns a single-band grayscale pyvips image - when the SVG is known to
+    be grayscale, any band already is that image and the colourspace
+    conversion is skipped.
+
+    The image is opened for sequential access, so libvips streams it through
+    each pipeline in small strips instead of decoding ~140MP into memory.
+    A sequential image can only be read once - call this for every pass.
+    """
+    import pyvips
 
-        # Convert PNG to PDF with grayscale and correct DPI for 707x1000mm
-        subprocess.run([
-            'convert',
-            tmp_png,
-            '-colorspace', 'Gray',
-            '-density', str(TARGET_DPI),
-            '-units', 'PixelsPerInch',
-            output_pdf
-        ], check=True, capture_output=True)
+    master = pyvips.Image.new_from_buffer(png_bytes, '', access='sequential')
 
-    finally:
-        if os.path.exists(tmp_png):
-            os.unlink(tmp_png)
+    if master.hasalpha():
+        master = master.flatten(
+            background=[background_value(background_color)] * (master.bands - 1)
+        )
 
+    if master.bands == 1:
+        return master
+    if grayscale:
+        return master[0]
+    return master.colourspace('b-w')
 
-def convert_cropped(svg_path, output_pdf):
+
+def make_page(convert, png_bytes, background_color, grayscale, *args):
     """
-    Cropped mode: Scale so height fills 2835 (square becomes 2835x2835),
-    then crop 415.5 pixels from each side horizontally.
+    Open a fresh pipeline from the master and run one conversion mode on it.
+    Returns the page as PNG bytes.
     """
-    print(f"  Converting cropped mode...")
+    return convert(load_master(png_bytes, background_color, grayscale), *args)
 
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-        tmp_png = tmp.name
 
-    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp2:
-        tmp_png_cropped = tmp2.name
+def write_pdf(pages, output_pdf):
+    """
+    Write grayscale PNG pages to a PDF with the correct DPI for 707x1000mm.
+    img2pdf embeds the PNG data as-is, so there is no re-encode.
+    """
+    import img2pdf
 
-    try:
-        # Step 1: Convert SVG to PNG at target height (2835x2835 for square)
-        subprocess.run([
-            'inkscape',
-            '--export-type=png',
-            '--export-filename=' + tmp_png,
-            '--export-width=' + str(TARGET_HEIGHT),
-            '--export-height=' + str(TARGET_HEIGHT),
-            str(svg_path)
-        ], check=True, capture_output=True)
-
-        # Step 2: Crop from center to target width
-        # Crop: 2835 wide -> 2004 wide = remove 831 pixels (415.5 from each side)
-        subprocess.run([
-            'convert',
-            tmp_png,
-            '-gravity', 'center',
-            '-crop', f'{TARGET_WIDTH}x{TARGET_HEIGHT}+0+0',
-            '+repage',
-            tmp_png_cropped
-        ], check=True, capture_output=True)
-
-        # Step 3: Convert cropped PNG to PDF with grayscale and correct DPI
-        subprocess.run([
-            'convert',
-            tmp_png_cropped,
-            '-colorspace', 'Gray',
-            '-density', str(TARGET_DPI),
-            '-units', 'PixelsPerInch',
-            output_pdf
-        ], check=True, capture_output=True)
-
-    finally:
-        if os.path.exists(tmp_png):
-            os.unlink(tmp_png)
-        if os.path.exists(tmp_png_cropped):
-            os.unlink(tmp_png_cropped)
-
-
-def process_svg(svg_path, output_dir):
-    """
-    Process a single SVG file and generate all three variants.
+    layout = img2pdf.get_fixed_dpi_layout_fun((TARGET_DPI, TARGET_DPI))
+    with open(output_pdf, 'wb') as f:
+        f.write(img2pdf.convert(pages, layout_fun=layout))
+
+
+def convert_centered(master, background_color):
+    """
+    Centered mode: Scale square SVG to fit width, center vertically with padding.
+    Returns the page as PNG bytes.
+    """
+    scaled = master.resize(TARGET_WIDTH / TARGET_HEIGHT)
+    page = scaled.embed(
+        0, (TARGET_HEIGHT - scaled.height) // 2, TARGET_WIDTH, TARGET_HEIGHT,
+        extend='background', background=[background_value(background_color)]
+    )
+
+    return page.write_to_buffer('.png')
+
+
+def convert_stretched(master):
+    """
+    Stretched mode: Scale to exact dimensions (aspect ratio ignored).
+    Returns the page as PNG bytes.
+    """
+    page = master.resize(TARGET_WIDTH / master.width, vscale=TARGET_HEIGHT / master.height)
+    return page.write_to_buffer('.png')
+
+
+def convert_cropped(master):
+    """
+    Cropped mode: The master already fills the target height, so crop
+    horizontally from the center to the target width.
+    Returns the page as PNG bytes.
+    """
+    left = (master.width - TARGET_WIDTH) // 2
+    page = master.crop(left, 0, TARGET_WIDTH, TARGET_HEIGHT)
+    return page.write_to_buffer('.png')
+
+
+def process_svg(svg_path, output_dir, combine=False):
+    """
+    Process a single SVG file and generate all three variants, either as
+    separate PDFs or, with combine, as the pages of one PDF.
+    Returns the paths of the PDFs that were written.
     """
     svg_path = Path(svg_path)
     output_dir = Path(output_dir)
@@ -277,58 +477,166 @@ def process_svg(svg_path, output_dir):
     base_name = svg_path.stem
 
     print(f"\nProcessing: {svg_path.name}")
+    # Workers run side by side, so tag every line with the file it's about
+    prefix = f"  [{svg_path.name}]"
+    written = []
 
-    # Detect background color
-    background_color = detect_background_color(svg_path)
-    print(f"  Detected background: {background_color}")
+    # Render the master while the background is detected - detection may
+    # need its own probe render, and neither depends on the other
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        master_render = executor.submit(render_master, svg_path)
 
-    # Generate three variants
-    try:
-        centered_pdf = output_dir / f"{base_name}-centered.pdf"
-        convert_centered(svg_path, centered_pdf, background_color)
-        print(f"  ✓ Created: {centered_pdf.name}")
-    except subprocess.CalledProcessError as e:
-        print(f"  ✗ Error creating centered PDF: {e}")
-        if e.stderr:
-            print(f"    stderr: {e.stderr.decode()[:500]}")
-    except Exception as e:
-        print(f"  ✗ Error creating centered PDF: {e}")
+        # Detect background color
+        background_color = detect_background_color(svg_path)
+        print(f"{prefix} Detected background: {background_color}")
+        grayscale = is_grayscale_svg(svg_path)
 
-    try:
-        stretched_pdf = output_dir / f"{base_name}-stretched.pdf"
-        convert_stretched(svg_path, stretched_pdf)
-        print(f"  ✓ Created: {stretched_pdf.name}")
-    except subprocess.CalledProcessError as e:
-        print(f"  ✗ Error creating stretched PDF: {e}")
-        if e.stderr:
-            print(f"    stderr: {e.stderr.decode()[:500]}")
-    except Exception as e:
-        print(f"  ✗ Error creating stretched PDF: {e}")
+        try:
+            png_bytes = master_render.result()
+        except subprocess.CalledProcessError as e:
+            print(f"{prefix} ✗ Error rendering SVG: {e}")
+            if e.stderr:
+                print(f"{prefix}   stderr: {e.stderr.decode()[:500]}")
+            return written
+        except Exception as e:
+            print(f"{prefix} ✗ Error rendering SVG: {e}")
+            return written
+
+    # Generate three variants concurrently - libvips releases the GIL,
+    # so threads are enough. Each streams its own pipeline from the master.
+    jobs = {
+        'centered': (convert_centered, (background_color,)),
+        'stretched': (convert_stretched, ()),
+        'cropped': (convert_cropped, ()),
+    }
+
+    pages = {}
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures = {}
+        for mode, (convert, extra_args) in jobs.items():
+            print(f"{prefix} Converting {mode} mode...")
+            future = executor.submit(
+                make_page, convert, png_bytes, background_color, grayscale, *extra_args
+            )
+            futures[future] = mode
+
+        for future in as_completed(futures):
+            mode = futures[future]
+            try:
+                pages[mode] = future.result()
+                if not combine:
+                    output_pdf = output_dir / f"{base_name}-{mode}.pdf"
+                    write_pdf([pages[mode]], output_pdf)
+                    written.append(output_pdf)
+                    print(f"{prefix} ✓ Created: {output_pdf.name}")
+            except Exception as e:
+                if combine:
+                    print(f"{prefix} ✗ Error creating {mode} page: {e}")
+                else:
+                    print(f"{prefix} ✗ Error creating {mode} PDF: {e}")
+
+    if combine:
+        output_pdf = output_dir / f"{base_name}.pdf"
+        failed = len(MODES) - len(pages)
+        if failed:
+            print(f"{prefix} ✗ Skipped {output_pdf.name}: {failed} of {len(MODES)} pages failed")
+        else:
+            try:
+                write_pdf([pages[mode] for mode in MODES], output_pdf)
+                written.append(output_pdf)
+                print(f"{prefix} ✓ Created: {output_pdf.name}")
+            except Exception as e:
+                print(f"{prefix} ✗ Error creating {output_pdf.name}: {e}")
+
+    return written
+
+
+def group_duplicates(svg_files):
+    """
+    Group SVG files with identical content, so each distinct SVG is only
+    rendered once. Returns lists of paths, in the order first seen.
+    """
+    groups = {}
+    for svg_file in svg_files:
+        digest = hashlib.sha256(svg_file.read_bytes()).hexdigest()
+        groups.setdefault(digest, []).append(svg_file)
+    return list(groups.values())
 
+
+def copy_outputs(svg_path, written, duplicate_path):
+    """
+    Copy the PDFs written for svg_path to the names of an identical SVG.
+    Returns the paths of the copies.
+    """
+    copies = []
+    for source in written:
+        # Output names all start with the SVG's stem - swap in the duplicate's
+        copy = source.with_name(duplicate_path.stem + source.name[len(svg_path.stem):])
+        shutil.copyfile(source, copy)
+        copies.append(copy)
+    return copies
+
+
+def init_worker():
+    """
+    Pool worker initializer. Each worker already runs its own pipelines, so
+    cap libvips' thread pool to keep N workers from spawning N x cores threads.
+    Must run before pyvips is first imported.
+
+    The heavy imports (pyvips, img2pdf, and PIL/numpy for the background
+    probe) are only used in workers. They are imported where they are used,
+    so the main process never loads them, and preloaded here once per worker.
+    """
+    os.environ.setdefault('VIPS_CONCURRENCY', '1')
+
+    import img2pdf  # noqa: F401
+    import numpy  # noqa: F401
+    import pyvips  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+
+def positive_int(value):
+    """
+    argparse type for options that need a count of at least one.
+    """
     try:
-        cropped_pdf = output_dir / f"{base_name}-cropped.pdf"
-        convert_cropped(svg_path, cropped_pdf)
-        print(f"  ✓ Created: {cropped_pdf.name}")
-    except subprocess.CalledProcessError as e:
-        print(f"  ✗ Error creating cropped PDF: {e}")
-        if e.stderr:
-            print(f"    stderr: {e.stderr.decode()[:500]}")
-    except Exception as e:
-        print(f"  ✗ Error creating cropped PDF: {e}")
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value!r}")
+    return number
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        '--max-workers', type=positive_int, default=os.cpu_count(),
+        help='Number of SVGs to process in parallel (default: CPU count)'
+    )
+    parser.add_argument(
+        '--combine', action='store_true',
+        help='Write one 3-page PDF per SVG instead of a PDF per mode'
+    )
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+
     input_dir = Path('/input')
     output_dir = Path('/output')
 
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Find all SVG files
-    svg_files = sorted(input_dir.glob('*.svg'))
-
-    # Filter out Zone.Identifier files
-    svg_files = [f for f in svg_files if not f.name.endswith(':Zone.Identifier')]
+    # Find all SVG files in one pass. Matching on the name first also skips
+    # Zone.Identifier files, which end in ':Zone.Identifier' rather than '.svg'
+    with os.scandir(input_dir) as entries:
+        svg_files = sorted(
+            Path(entry.path) for entry in entries
+            if entry.name.endswith('.svg') and entry.is_file()
+        )
 
     if not svg_files:
         print("No SVG files found in input directory!")
@@ -336,15 +644,36 @@ def main():
 
     print(f"Found {len(svg_files)} SVG file(s) to process")
     print(f"Target dimensions: {TARGET_WIDTH}x{TARGET_HEIGHT} pixels")
+    print(f"Workers: {args.max_workers}")
     print("=" * 60)
 
-    # Process each SVG
-    for svg_file in svg_files:
-        process_svg(svg_file, output_dir)
+    # Render each distinct SVG once
+    groups = group_duplicates(svg_files)
+    if len(groups) < len(svg_files):
+        print(f"Skipping {len(svg_files) - len(groups)} duplicate SVG(s)")
+
+    # Process SVGs in parallel - each one is independent and the heavy
+    # lifting happens in the SVG renderer and libvips
+    with ProcessPoolExecutor(max_workers=args.max_workers,
+                             initializer=init_worker) as executor:
+        results = list(executor.map(
+            partial(process_svg, output_dir=output_dir, combine=args.combine),
+            [group[0] for group in groups]
+        ))
+
+    for (svg_file, *duplicates), written in zip(groups, results):
+        if not written:
+            continue
+        for duplicate in duplicates:
+            copies = copy_outputs(svg_file, written, duplicate)
+            print(f"Copied {len(copies)} PDF(s) from {svg_file.name} for duplicate {duplicate.name}")
 
     print("\n" + "=" * 60)
     print(f"Processing complete! Check {output_dir} for output PDFs.")
-    print(f"Each SVG generated 3 variants: -centered.pdf, -stretched.pdf, -cropped.pdf")
+    if args.combine:
+        print(f"Each SVG generated one PDF with 3 pages: centered, stretched, cropped")
+    else:
+        print(f"Each SVG generated 3 variants: -centered.pdf, -stretched.pdf, -cropped.pdf")
 
 
 if __name__ == '__main__':
@@ -27,7 +27,7 @@ echo ""
 docker run --rm \
     -v "$SCRIPT_DIR/svgs:/input:ro" \
     -v "$SCRIPT_DIR/output:/output" \
-    "$IMAGE_NAME"
+    "$IMAGE_NAME" "$@"
 
 echo ""
 echo "=========================================="